@@ -10,15 +10,32 @@ PDF文章处理程序
 import os
 import json
 import uuid
+import hashlib
+import mmap
 import logging
-from typing import Dict, List, Optional
+import sys
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 from pathlib import Path
-import PyPDF2
+import fitz  # PyMuPDF
 from tqdm import tqdm
 import re
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from dotenv import load_dotenv
 import time
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from contextlib import contextmanager
+try:
+    import orjson
+except ImportError:  # 未安装orjson时退回标准库json
+    orjson = None
+try:
+    import fastjsonschema
+except ImportError:  # 未安装fastjsonschema时只做基本的字段检查
+    fastjsonschema = None
 
 # 加载环境变量
 load_dotenv()
@@ -33,72 +50,282 @@ logging.basicConfig(
     ]
 )
 
-class LLMProcessor:
-    def __init__(self):
-        self.api_key = os.getenv('KIMI_API_KEY')
-        self.api_url = os.getenv('KIMI_API_BASE')
-        self.model = os.getenv('KIMI_DEFAULT_MODEL')
-        self.headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json"
+# 预编译的单词匹配模式，用于统计字数
+_WORD_RE = re.compile(r"\S+")
+
+def _batch_uuid4(count: int) -> List[str]:
+    """一次性读取随机字节，批量生成UUID4字符串"""
+    random_bytes = os.urandom(16 * count)
+    return [str(uuid.UUID(bytes=random_bytes[i:i + 16], version=4)) for i in range(0, 16 * count, 16)]
+
+# LLM返回结果的结构约束，预先编译一次
+_SECTIONS_SCHEMA = {
+    "type": "object",
+    "required": ["sections"],
+    "properties": {
+        "sections": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "required": ["heading_level", "chapter_path", "start_position", "end_position"],
+                "properties": {
+                    "heading_level": {"type": "integer"},
+                    "start_position": {"type": "integer"},
+                    "end_position": {"type": "integer"}
+                }
+            }
         }
-        
-    def analyze_document(self, text: str) -> dict:
-        """使用LLM分析文档结构"""
-        prompt = '''你是一个专业的文献分析助手。请分析以下学术文献的结构，识别所有标题及其层级。
+    }
+}
+_SECTIONS_VALIDATOR = fastjsonschema.compile(_SECTIONS_SCHEMA) if fastjsonschema is not None else None
+
+def _validate_sections(result) -> None:
+    """校验LLM返回的文档结构，不符合要求时抛出ValueError"""
+    if _SECTIONS_VALIDATOR is not None:
+        try:
+            _SECTIONS_VALIDATOR(result)
+        except fastjsonschema.JsonSchemaException as e:
+            raise ValueError(f"返回的JSON结构不符合要求: {e.message}")
+    elif not isinstance(result, dict) or 'sections' not in result:
+        raise ValueError("返回的JSON缺少'sections'字段")
+
+def _env_flag(name: str) -> bool:
+    """读取开关型环境变量，1/true/yes/on（不区分大小写）视为开启"""
+    return os.getenv(name, "0").strip().lower() in ("1", "true", "yes", "on")
+
+def _json_loads(data):
+    """解析JSON，优先使用orjson，未安装时退回标准库"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+@contextmanager
+def _open_pdf(pdf_path: str):
+    """以内存映射方式打开PDF，由操作系统按需分页读取，省去一次完整的文件读入和拷贝"""
+    with open(pdf_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        view = memoryview(mm)
+        try:
+            with fitz.open(stream=view, filetype="pdf") as doc:
+                yield doc
+        finally:
+            # 先释放视图，mmap才能正常关闭
+            view.release()
+
+# 页数达到该值才启用多进程提取，页数较少时进程池启动开销大于收益
+_PARALLEL_MIN_PAGES = 50
+
+def _extract_page_range(pdf_path: str, start: int, stop: int) -> Tuple[int, List[str]]:
+    """提取[start, stop)范围内各页的文本（在子进程中运行，每个进程只打开一次PDF）"""
+    with _open_pdf(pdf_path) as doc:
+        return start, [doc.load_page(idx).get_text("text") or "" for idx in range(start, stop)]
+
+class LLMProcessor:
+    # 提示词在类级别只构建一次
+    SYSTEM_PROMPT = "你是一个专业的文献分析助手。请只返回JSON格式的响应，不要包含任何其他文本。"
+    # 固定的格式说明作为静态前缀，文档内容单独放在最后一条消息中，便于服务端复用前缀缓存
+    INSTRUCTION_PROMPT = '''你是一个专业的文献分析助手。请分析以下学术文献的结构，识别所有标题及其层级。
 
         请严格按照以下JSON格式返回结果，确保返回的是合法的JSON（不要包含任何其他文本）：
-        {{
+        {
             "sections": [
-                {{
+                {
                     "heading_level": 0-6,  # 0表示正文，1-6表示标题级别
                     "chapter_path": "完整的章节路径",
                     "start_position": 在原文中的起始位置,
                     "end_position": 在原文中的结束位置
-                }}
+                }
             ]
-        }}
+        }
 
         注意：
         1. 只需返回文档结构信息，不要包含具体内容
         2. 对于正文段落，使用其所属章节作为chapter_path
         3. 确保start_position和end_position准确标记每个部分在原文中的位置
 
-        以下是需要分析的文献内容：
-        {text}
-        '''
+        以下是需要分析的文献内容：'''
+
+    def __init__(self):
+        self.api_key = os.getenv('KIMI_API_KEY')
+        self.api_url = os.getenv('KIMI_API_BASE')
+        self.model = os.getenv('KIMI_DEFAULT_MODEL')
+        self.headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json",
+            # requests默认已发送该值，这里显式写出以便在请求详情中看到；压缩的响应由requests透明解压
+            "Accept-Encoding": "gzip, deflate"
+        }
+        # 复用同一个会话：保持长连接，分块并发请求时共享连接池
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        adapter = HTTPAdapter(
+            pool_connections=16,
+            pool_maxsize=16,
+            max_retries=Retry(
+                total=3,
+                read=0,  # 读取超时或连接中断时不重发，避免同一次生成被重复计费
+                backoff_factor=0.5,
+                status_forcelist=[429, 500, 502, 503, 504],
+                allowed_methods=frozenset(["POST"]),  # 默认不重试POST，这里的分析请求可安全重发
+                raise_on_status=False  # 重试耗尽后仍返回最后的响应，交由下方统一处理
+            )
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        # 是否打印请求详情和逐块的流式内容（LLM_VERBOSE=1开启）
+        self.verbose = _env_flag("LLM_VERBOSE")
+        # 为静态前缀添加cache_control标记（仅对支持该字段的服务商开启）
+        self.prompt_cache_control = _env_flag("LLM_PROMPT_CACHE_CONTROL")
+        # 本地结果缓存：相同模型+提示词直接复用上次的响应
+        self.cache_dir = Path("pdf_mid/.llm_cache")
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        
+    def _build_messages(self, text: str) -> List[Dict]:
+        """构造请求消息：系统提示和格式说明在前保持不变，文档内容在后"""
+        instruction_message = {"role": "user", "content": self.INSTRUCTION_PROMPT}
+        if self.prompt_cache_control:
+            # cache_control只能标在内容块上，需改用内容块列表的形式
+            instruction_message["content"] = [{
+                "type": "text",
+                "text": self.INSTRUCTION_PROMPT,
+                "cache_control": {"type": "ephemeral"}
+            }]
+        return [
+            {"role": "system", "content": self.SYSTEM_PROMPT},
+            instruction_message,
+            {"role": "user", "content": text}
+        ]
+
+    def _cache_key(self, system_prompt: str, user_prompt: str) -> str:
+        """根据模型和完整提示词生成缓存键"""
+        raw = f"{self.model}|{system_prompt}|{user_prompt}"
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def _load_cache(self, key: str):
+        """读取缓存的LLM结果，未命中时返回None"""
+        cache_file = self.cache_dir / f"{key}.json"
+        if not cache_file.exists():
+            return None
+        try:
+            with open(cache_file, 'r', encoding='utf-8') as f:
+                result = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logging.warning(f"读取LLM缓存失败，将重新请求: {str(e)}")
+            return None
+        # 缓存中只应是解析后的结构（旧版本可能存过原始字符串）
+        return result if isinstance(result, dict) else None
+
+    def _save_cache(self, key: str, result) -> None:
+        """写入LLM结果缓存（先写临时文件再原子替换，避免留下半个文件）"""
+        cache_file = self.cache_dir / f"{key}.json"
+        tmp_file = cache_file.with_suffix('.tmp')
+        try:
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(result, f, ensure_ascii=False)
+            os.replace(tmp_file, cache_file)
+        except OSError as e:
+            logging.warning(f"写入LLM缓存失败: {str(e)}")
+        
+    def _chunk_text(self, text: str, max_chars: int = 30000, overlap: int = 500) -> List[Tuple[int, int]]:
+        """将长文本切分为相互重叠的块，返回各块的(起始, 结束)位置"""
+        chunks = []
+        start = 0
+        while True:
+            end = min(start + max_chars, len(text))
+            if end < len(text):
+                # 依次尝试在空行、换行、句末处切分，都找不到时才硬切
+                for sep in ("\n\n", "\n", "。", ". "):
+                    split = text.rfind(sep, start + max_chars // 2, end)
+                    if split != -1:
+                        end = split + len(sep)
+                        break
+            chunks.append((start, end))
+            if end >= len(text):
+                return chunks
+            start = max(end - overlap, start + 1)
+
+    def analyze_document(self, text: str) -> dict:
+        """使用LLM分析文档结构，长文档分块后并发请求"""
+        chunks = self._chunk_text(text)
+        if len(chunks) == 1:
+            return self._call_once(text)
+        
+        print(f"\n文档较长，拆分为{len(chunks)}块并发分析...")
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(self._call_once, [text[start:end] for start, end in chunks]))
+        
+        # 将各块的位置换算回全文位置；重叠区内的部分已由上一块给出，
+        # 跨过上一块结尾的部分从该结尾处截起，避免丢失切分点之后的文本
+        sections = []
+        prev_end = 0
+        for (start, end), result in zip(chunks, results):
+            for section in result['sections']:
+                section = dict(section)
+                section['start_position'] = max(section['start_position'] + start, prev_end)
+                section['end_position'] += start
+                if section['end_position'] > prev_end:
+                    sections.append(section)
+            prev_end = end
         
+        return {"sections": sections}
+
+    def _consume_sse_event(self, event: bytes, buf: bytearray) -> None:
+        """解析一个SSE事件，将其中的增量内容追加到buf"""
+        for raw in event.split(b"\n"):
+            raw = raw.rstrip(b"\r")
+            if not raw.startswith(b"data: ") or raw[6:].strip() == b"[DONE]":
+                continue
+            try:
+                data = _json_loads(bytes(raw[6:]))
+                if data['choices'][0]['finish_reason'] is not None:
+                    continue
+                content = data['choices'][0]['delta'].get('content', '')
+                if content:
+                    if self.verbose:
+                        print(content, end='', flush=True)
+                    buf += content.encode('utf-8')
+            except Exception as e:
+                print(f"\n解析流式数据时出错: {str(e)}")
+
+    def _call_once(self, text: str) -> dict:
+        """对单块文本调用LLM分析文档结构"""
         try:
+            messages = self._build_messages(text)
+            
+            # 相同模型和提示词的结果直接从本地缓存读取
+            cache_key = self._cache_key(self.SYSTEM_PROMPT, self.INSTRUCTION_PROMPT + text)
+            cached_result = self._load_cache(cache_key)
+            if cached_result is not None:
+                print("\n命中LLM缓存，跳过API请求")
+                return cached_result
+            
             print("\n准备发送请求到LLM API...")
-            print("\n请求详情:")
-            print("-" * 50)
-            print(f"API URL: {self.api_url}")
-            print(f"Model: {self.model}")
-            print("Headers:")
-            safe_headers = self.headers.copy()
-            safe_headers['Authorization'] = 'Bearer sk-***'  # 隐藏API key
-            print(json.dumps(safe_headers, indent=2))
+            if self.verbose:
+                print("\n请求详情:")
+                print("-" * 50)
+                print(f"API URL: {self.api_url}")
+                print(f"Model: {self.model}")
+                print("Headers:")
+                safe_headers = self.headers.copy()
+                safe_headers['Authorization'] = 'Bearer sk-***'  # 隐藏API key
+                print(json.dumps(safe_headers, indent=2))
             
             request_data = {
                 "model": self.model,
-                "messages": [
-                    {"role": "system", "content": "你是一个专业的文献分析助手。请只返回JSON格式的响应，不要包含任何其他文本。"},
-                    {"role": "user", "content": prompt.format(text=text)}
-                ],
+                "messages": messages,
                 "temperature": 0.3,
                 "stream": True  # 启用流式输出
             }
             
-            print("\n请求数据:")
-            print(f"Temperature: {request_data['temperature']}")
-            print(f"System message: {request_data['messages'][0]['content']}")
-            print("Prompt前100个字符: " + request_data['messages'][1]['content'][:100] + "...")
-            print("-" * 50)
+            if self.verbose:
+                print("\n请求数据:")
+                print(f"Temperature: {request_data['temperature']}")
+                print(f"System message: {request_data['messages'][0]['content']}")
+                print("文档前100个字符: " + request_data['messages'][-1]['content'][:100] + "...")
+                print("-" * 50)
             
             print("\n发送请求中...")
-            response = requests.post(
+            response = self.session.post(
                 self.api_url,
-                headers=self.headers,
                 json=request_data,
                 timeout=60,
                 stream=True  # 启用流式响应
@@ -110,26 +337,21 @@ class LLMProcessor:
                 print("\n开始接收流式响应:")
                 print("-" * 50)
                 
-                # 用于累积完整的响应
-                full_content = ""
+                # 以字节形式累积完整的响应，避免字符串反复拼接
+                buf = bytearray()
                 
-                # 处理流式响应
-                for line in response.iter_lines():
-                    if line:
-                        try:
-                            # 解析SSE数据
-                            line = line.decode('utf-8')
-                            if line.startswith('data: '):
-                                data = json.loads(line[6:])
-                                if data['choices'][0]['finish_reason'] is not None:
-                                    continue
-                                content = data['choices'][0]['delta'].get('content', '')
-                                if content:
-                                    print(content, end='', flush=True)
-                                    full_content += content
-                        except Exception as e:
-                            print(f"\n解析流式数据时出错: {str(e)}")
-                            continue
+                # 处理流式响应：直接按空行切分原始字节得到SSE事件，不再逐行解码
+                pending = bytearray()
+                for chunk in response.iter_content(chunk_size=8192):
+                    pending += chunk
+                    # 统一CRLF换行；跨块截断的\r会在下一块拼上\n后再被替换
+                    if b"\r\n" in pending:
+                        pending = pending.replace(b"\r\n", b"\n")
+                    while b"\n\n" in pending:
+                        event, _, pending = pending.partition(b"\n\n")
+                        self._consume_sse_event(event, buf)
+                if pending.strip():
+                    self._consume_sse_event(pending, buf)
                 
                 print("\n\n响应接收完成")
                 print("-" * 50)
@@ -137,29 +359,30 @@ class LLMProcessor:
                 # 清理和解析最终的JSON
                 try:
                     print("\n清理和解析JSON...")
-                    content = full_content.strip()
-                    if content.startswith('```json'):
+                    raw = bytes(buf).strip()
+                    if raw.startswith(b'```json'):
                         print("检测到JSON代码块标记，正在移除...")
-                        content = content[7:]
-                    if content.endswith('```'):
-                        content = content[:-3]
-                    content = content.strip()
+                        raw = raw[7:]
+                    if raw.endswith(b'```'):
+                        raw = raw[:-3]
+                    raw = raw.strip()
                     
-                    print("\n最终的JSON内容:")
-                    print("-" * 50)
-                    print(content)
-                    print("-" * 50)
+                    if self.verbose:
+                        print("\n最终的JSON内容:")
+                        print("-" * 50)
+                        print(raw.decode('utf-8', errors='replace'))
+                        print("-" * 50)
                     
                     print("\n尝试解析JSON...")
-                    parsed_result = json.loads(content)
+                    parsed_result = _json_loads(raw)
                     
                     print("JSON解析成功，验证结构...")
-                    if 'sections' not in parsed_result:
-                        raise ValueError("返回的JSON缺少'sections'字段")
+                    _validate_sections(parsed_result)
                         
                     print(f"sections数组长度: {len(parsed_result['sections'])}")
                     print("数据结构验证成功")
                     
+                    self._save_cache(cache_key, parsed_result)
                     return parsed_result
                     
                 except json.JSONDecodeError as e:
@@ -167,7 +390,7 @@ class LLMProcessor:
                     print(f"错误位置: 第{e.lineno}行，第{e.colno}列")
                     print(f"错误的字符: {e.char}")
                     print("\n问题行的内容:")
-                    lines = content.split('\n')
+                    lines = raw.decode('utf-8', errors='replace').split('\n')
                     if e.lineno <= len(lines):
                         print(lines[e.lineno - 1])
                         print(' ' * (e.colno - 1) + '^')
@@ -198,19 +421,74 @@ class PDFProcessor:
         self.input_dir = Path("pdf_in")
         self.output_dir = Path("pdf_mid")
         self.output_dir.mkdir(exist_ok=True)
+        # 按PDF内容缓存提取出的文本，重试或重跑时无需重新解析PDF
+        self.text_cache_dir = self.output_dir / ".text_cache"
+        self.text_cache_dir.mkdir(exist_ok=True)
         self.llm_processor = LLMProcessor()
         
+    def _extract_pages(self, pdf_path: str) -> List[str]:
+        """提取各页文本，结果以PDF文件的SHA-256为键缓存"""
+        sha256 = hashlib.sha256()
+        with open(pdf_path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                sha256.update(block)
+        cache_file = self.text_cache_dir / f"{sha256.hexdigest()}.json"
+        
+        if cache_file.exists():
+            try:
+                with open(cache_file, 'r', encoding='utf-8') as f:
+                    parts = json.load(f)
+                print("\n命中文本缓存，跳过PDF解析")
+                return parts
+            except (OSError, json.JSONDecodeError) as e:
+                logging.warning(f"读取文本缓存失败，将重新解析PDF: {str(e)}")
+        
+        # PyMuPDF在C层完成版面解析和解码，比PyPDF2快得多；页数较少时直接在当前进程提取
+        with _open_pdf(pdf_path) as doc:
+            page_count = doc.page_count
+            if page_count < _PARALLEL_MIN_PAGES:
+                parts = [page.get_text("text") or "" for page in tqdm(doc, desc="提取PDF文本")]
+        
+        if page_count >= _PARALLEL_MIN_PAGES:
+            # 按连续页码区间分给各进程，每个进程只打开一次PDF
+            workers = min(os.cpu_count() or 1, page_count)
+            step = -(-page_count // workers)
+            starts = list(range(0, page_count, step))
+            stops = [min(start + step, page_count) for start in starts]
+            with ProcessPoolExecutor(max_workers=len(starts)) as executor:
+                ranges = list(tqdm(
+                    executor.map(partial(_extract_page_range, pdf_path), starts, stops),
+                    total=len(starts),
+                    desc="提取PDF文本"
+                ))
+            ranges.sort(key=lambda item: item[0])
+            parts = [text for _, texts in ranges for text in texts]
+        
+        tmp_file = cache_file.with_suffix('.tmp')
+        try:
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(parts, f, ensure_ascii=False)
+            os.replace(tmp_file, cache_file)
+        except OSError as e:
+            logging.warning(f"写入文本缓存失败: {str(e)}")
+        
+        return parts
+
     def extract_text(self, pdf_path: str) -> List[Dict]:
         """从PDF提取文本并使用LLM进行结构化处理"""
+        return list(self.iter_paragraphs(pdf_path))
+
+    def iter_paragraphs(self, pdf_path: str) -> Iterator[Dict]:
+        """逐个生成段落信息字典，可直接交给save_jsonl流式写出"""
         logging.info(f"开始处理文件: {pdf_path}")
         
         # 首先提取所有文本
-        full_text = ""
         try:
-            with open(pdf_path, 'rb') as file:
-                reader = PyPDF2.PdfReader(file)
-                for page in tqdm(reader.pages, desc="提取PDF文本"):
-                    full_text += page.extract_text() + "\n"
+            parts = self._extract_pages(pdf_path)
+            # 先收集各页文本再一次性拼接，避免逐页 += 造成的平方级复制
+            full_text = "\n".join(parts) + "\n"
+            # 每页（含分隔换行）在全文中的结束位置，用于把字符位置映射回真实页码
+            page_ends = np.cumsum([len(part) + 1 for part in parts], dtype=np.int64)
                     
             print(f"\n成功提取文本，总长度: {len(full_text)} 字符")
             
@@ -222,8 +500,12 @@ class PDFProcessor:
                 raise Exception("LLM分析失败")
                 
             # 转换为段落列表
-            paragraphs = []
-            for section in llm_result['sections']:
+            sections = llm_result['sections']
+            paragraph_ids = _batch_uuid4(len(sections))
+            # 一次性计算所有段落的页码
+            positions = np.fromiter((sec['start_position'] for sec in sections), dtype=np.int64, count=len(sections))
+            page_nums = self._estimate_page_numbers(positions, page_ends).tolist()
+            for idx, section in enumerate(sections):
                 # 从原文提取实际内容
                 content = full_text[section['start_position']:section['end_position']].strip()
                 
@@ -231,18 +513,18 @@ class PDFProcessor:
                     content=content,
                     heading_level=section['heading_level'],
                     chapter_path=section['chapter_path'],
-                    page_num=self._estimate_page_number(section['start_position'], full_text)
+                    page_num=page_nums[idx],
+                    paragraph_id=paragraph_ids[idx]
                 )
-                paragraphs.append(para_dict)
-                
-            return paragraphs
+                yield para_dict
             
         except Exception as e:
             logging.error(f"处理PDF文件时出错: {str(e)}")
             raise
 
     def _create_paragraph_dict(self, content: str, heading_level: int, 
-                             chapter_path: str, page_num: int) -> Dict:
+                             chapter_path: str, page_num: int,
+                             paragraph_id: Optional[str] = None) -> Dict:
         """创建段落信息字典"""
         # 处理章节路径
         if heading_level > 0:
@@ -253,11 +535,11 @@ class PDFProcessor:
             formatted_chapter = chapter_path if chapter_path else "未类"
         
         return {
-            "paragraph_id": str(uuid.uuid4()),
+            "paragraph_id": paragraph_id or str(uuid.uuid4()),
             "heading_level": heading_level,
             "chapter": formatted_chapter,
             "content": content.strip(),
-            "word_count": len(content.split()),
+            "word_count": len(_WORD_RE.findall(content)),
             "translation_status": "pending",
             "position": {
                 "page": page_num,
@@ -265,46 +547,98 @@ class PDFProcessor:
             }
         }
 
-    def _estimate_page_number(self, start_position: int, full_text: str) -> int:
-        """估计段落所在的页码"""
-        # 假设每页约2000个字符
-        chars_per_page = 2000
-        return max(1, start_position // chars_per_page + 1)
+    def _estimate_page_numbers(self, positions: np.ndarray, page_ends: np.ndarray) -> np.ndarray:
+        """批量估计段落所在的页码"""
+        # 按各页结束位置二分查找，超出全文范围的位置归到最后一页
+        pages = np.searchsorted(page_ends, positions, side="right") + 1
+        return np.clip(pages, 1, max(len(page_ends), 1))
 
-    def save_json(self, paragraphs: List[Dict], input_path: str):
+    def save_json(self, paragraphs: Iterable[Dict], input_path: str):
         """保存处理结果为JSON文件"""
         input_filename = Path(input_path).stem
         output_path = self.output_dir / f"{input_filename}.json"
         
         try:
-            with open(output_path, 'w', encoding='utf-8') as f:
-                json.dump(paragraphs, f, ensure_ascii=False, indent=2)
+            paragraphs = list(paragraphs)
+            if orjson is not None:
+                output_path.write_bytes(
+                    orjson.dumps(paragraphs, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+                )
+            else:
+                with open(output_path, 'w', encoding='utf-8') as f:
+                    json.dump(paragraphs, f, ensure_ascii=False, indent=2)
             logging.info(f"已保存处理结果到: {output_path}")
         except Exception as e:
             logging.error(f"保存JSON文件时出错: {str(e)}")
             raise
 
-    def print_summary(self, paragraphs: List[Dict]):
-        """打印文档结构概览表格"""
-        print("\n文档结构概览:")
-        print("-" * 110)  # 增加宽度以适应序号列
-        print(f"{'序号':^6} | {'层级':^8} | {'章节':^30} | {'字数':^8} | {'页码':^8} | {'状态':^12}")
-        print("-" * 110)
+    def save_jsonl(self, paragraphs: Iterable[Dict], input_path: str) -> int:
+        """逐行写出处理结果（JSON Lines），不在内存中保留整个段落列表，返回写出的段落数"""
+        input_filename = Path(input_path).stem
+        output_path = self.output_dir / f"{input_filename}.jsonl"
+        
+        # 段落在写出过程中才逐个生成，先写临时文件，全部成功后再替换，处理失败时保留上次的结果
+        tmp_path = output_path.with_suffix('.jsonl.tmp')
+        count = 0
+        try:
+            with open(tmp_path, 'wb') as f:
+                for para in paragraphs:
+                    if orjson is not None:
+                        f.write(orjson.dumps(para))
+                    else:
+                        f.write(json.dumps(para, ensure_ascii=False).encode('utf-8'))
+                    f.write(b"\n")
+                    count += 1
+            os.replace(tmp_path, output_path)
+            logging.info(f"已保存处理结果到: {output_path}")
+            return count
+        except Exception as e:
+            tmp_path.unlink(missing_ok=True)
+            logging.error(f"保存JSONL文件时出错: {str(e)}")
+            raise
+
+    def collect_summary(self, paragraphs: Iterable[Dict], summary: Dict) -> Iterator[Dict]:
+        """逐个透传段落，同时在summary中累计总数并只保留概览要展示的段落（不含正文）"""
+        for para in paragraphs:
+            summary['total_paras'] += 1
+            summary['total_words'] += para['word_count']
+            if para['heading_level'] > 0 or para['word_count'] > 100:
+                summary['rows'].append({key: value for key, value in para.items() if key != 'content'})
+            yield para
+
+    def print_summary(self, paragraphs: List[Dict], totals: Optional[Tuple[int, int]] = None):
+        """打印文档结构概览表格；totals为(总段落数, 总字数)，给出时paragraphs可只含要展示的段落"""
+        # 先拼好整张表格再一次性输出，避免逐行调用print
+        lines = [
+            "\n文档结构概览:",
+            "-" * 110,  # 增加宽度以适应序号列
+            f"{'序号':^6} | {'层级':^8} | {'章节':^30} | {'字数':^8} | {'页码':^8} | {'状态':^12}",
+            "-" * 110
+        ]
         
         # 只获取标题和主要段落
         significant_paras = [p for p in paragraphs if p['heading_level'] > 0 or p['word_count'] > 100]
         
-        for idx, para in enumerate(significant_paras, 1):
-            heading = "标题" if para['heading_level'] > 0 else "正文"
-            # 截断过长的内容
-            chapter = para['chapter'][:28] + '..' if len(para['chapter']) > 30 else para['chapter'].ljust(30)
-            print(f"{idx:^6} | {heading:^8} | {chapter} | {para['word_count']:^8} | {para['position']['page']:^8} | {para['translation_status']:^12}")
+        # 章节名过长时截断
+        lines.extend(
+            f"{idx:^6} | {'标题' if para['heading_level'] > 0 else '正文':^8} | "
+            f"{para['chapter'][:28] + '..' if len(para['chapter']) > 30 else para['chapter'].ljust(30)} | "
+            f"{para['word_count']:^8} | {para['position']['page']:^8} | {para['translation_status']:^12}"
+            for idx, para in enumerate(significant_paras, 1)
+        )
         
-        # 打印统计信息
-        total_words = sum(p['word_count'] for p in paragraphs)
+        # 统计信息
         total_paras = len(paragraphs)
-        print("-" * 110)
-        print(f"总段落数: {total_paras}, 总字数: {total_words}")
+        if totals is not None:
+            total_paras, total_words = totals
+        elif total_paras > 1000:
+            total_words = int(np.fromiter((p['word_count'] for p in paragraphs), dtype=np.int64, count=total_paras).sum())
+        else:
+            total_words = sum(p['word_count'] for p in paragraphs)
+        lines.append("-" * 110)
+        lines.append(f"总段落数: {total_paras}, 总字数: {total_words}")
+        
+        sys.stdout.write("\n".join(lines) + "\n")
 
     def welcome(self) -> str:
         """显示欢迎信息并获取输入文件路径"""
@@ -334,14 +668,23 @@ def main():
         # 获取输入文件
         pdf_path = processor.welcome()
         
-        # 处理PDF文件
-        paragraphs = processor.extract_text(pdf_path)
-        
-        # 保存结果
-        processor.save_json(paragraphs, pdf_path)
-        
-        # 打印文档概览
-        processor.print_summary(paragraphs)
+        if _env_flag("PARA_OUTPUT_JSONL"):
+            # 逐段写出JSON Lines，内存中只保留概览需要的信息
+            summary = {"rows": [], "total_paras": 0, "total_words": 0}
+            paragraphs = processor.iter_paragraphs(pdf_path)
+            processor.save_jsonl(processor.collect_summary(paragraphs, summary), pdf_path)
+            
+            # 打印文档概览
+            processor.print_summary(summary['rows'], totals=(summary['total_paras'], summary['total_words']))
+        else:
+            # 处理PDF文件
+            paragraphs = processor.extract_text(pdf_path)
+            
+            # 保存结果（后续翻译程序读取该JSON文件）
+            processor.save_json(paragraphs, pdf_path)
+            
+            # 打印文档概览
+            processor.print_summary(paragraphs)
         
         print("\n处理完成!")
         